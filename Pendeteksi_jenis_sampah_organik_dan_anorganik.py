@@ -1,14 +1,9 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from PIL import Image
-import joblib
-import requests
 from io import BytesIO
-import plotly.express as px
 import plotly.graph_objects as go
+from numba import njit
 
 # Konfigurasi halaman
 st.set_page_config(
@@ -19,7 +14,7 @@ st.set_page_config(
 )
 
 # CSS custom
-st.markdown("""
+_CSS = """
 <style>
     .main-header {
         font-size: 3rem;
@@ -42,7 +37,44 @@ st.markdown("""
         border: 2px solid #DC143C;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
+
+_HEADER = '<h1 class="main-header">🗑️ Deteksi Jenis Sampah</h1>'
+
+# Label hasil prediksi, diindeks dengan kode label dari kernel Numba
+LABELS = np.array(["ORGANIK", "ANORGANIK"])
+REKOMENDASI = np.array(["Kompos", "Daur Ulang"])
+
+# Kolom fitur numerik pada CSV upload
+FEATURE_COLUMNS = ['berat', 'volume', 'kadar_air', 'suhu']
+
+# Mapping fitur tambahan ke nilai numerik
+WARNA_MAP = {"Hijau": 1, "Coklat": 2, "Putih": 3, "Transparan": 4, "Warna-warni": 5}
+TEKSTUR_MAP = {"Lunak": 1, "Keras": 2, "Elastis": 3, "Rapuh": 4}
+
+@njit(cache=True)
+def _predict_scalar(berat, volume, kadar_air, suhu):
+    """Kernel prediksi satu sampel tanpa percabangan (0 = ORGANIK, 1 = ANORGANIK)"""
+    # Skor bertanda: positif = ORGANIK, confidence = 0.5 + |skor|
+    # Random forest simulation
+    score = (kadar_air * 0.4 + suhu * 0.3) / 100 - 0.5
+    
+    # Aturan prioritas sebagai select (confidence 0.78 dan 0.85)
+    score = -0.28 if (berat < 50) & (volume < 100) else score
+    score = 0.35 if (kadar_air > 60) & (suhu > 25) else score
+    
+    return 1 - int(score > 0.0), 0.5 + abs(score)
+
+# Sengaja tanpa parallel=True: tiap sesi Streamlit berjalan di thread sendiri
+# dan layer threading workqueue Numba tidak aman untuk pemanggilan bersamaan
+@njit(cache=True)
+def _predict_batch(berat, volume, kadar_air, suhu, out_label, out_conf):
+    """Kernel prediksi batch, hasil ditulis ke out_label dan out_conf"""
+    for i in range(berat.shape[0]):
+        label, confidence = _predict_scalar(berat[i], volume[i], kadar_air[i], suhu[i])
+        out_label[i] = label
+        out_conf[i] = confidence
 
 class WasteDetector:
     def __init__(self):
@@ -51,38 +83,33 @@ class WasteDetector:
     def load_model(self):
         """Load model machine learning (simulasi)"""
         # Dalam implementasi nyata, ini akan load model yang sudah di-train
-        try:
-            # Simulasi model sederhana
-            model = {
-                'predict': self.predict_waste_type
-            }
-            return model
-        except:
-            return None
-    
-    def predict_waste_type(self, features):
-        """Fungsi prediksi jenis sampah"""
-        # Fitur: [berat_gram, volume_cm3, kadar_air, suhu_celcius]
-        berat, volume, kadar_air, suhu = features
+        # Simulasi model sederhana
+        model = {
+            'predict': self.predict_batch
+        }
         
-        # Logika sederhana untuk klasifikasi
-        if kadar_air > 60 and suhu > 25:
-            return "ORGANIK", 0.85
-        elif berat < 50 and volume < 100:
-            return "ANORGANIK", 0.78
-        else:
-            # Random forest simulation
-            organic_score = (kadar_air * 0.4 + suhu * 0.3) / 100
-            inorganic_score = 1 - organic_score
-            
-            if organic_score > inorganic_score:
-                return "ORGANIK", organic_score
-            else:
-                return "ANORGANIK", inorganic_score
+        # Kompilasi awal kernel agar request pertama tidak menunggu JIT
+        sample = np.ones(1, dtype=np.float64)
+        model['predict'](sample, sample, sample, sample)
+        return model
+    
+    def predict_batch(self, berat, volume, kadar_air, suhu):
+        """Fungsi prediksi jenis sampah untuk array fitur"""
+        # Fitur: array float64 berat_gram, volume_cm3, kadar_air, suhu_celcius
+        # Hasil: kode label (indeks ke LABELS) dan confidence per sampel
+        out_label = np.empty(len(berat), dtype=np.int8)
+        out_conf = np.empty(len(berat), dtype=np.float64)
+        _predict_batch(berat, volume, kadar_air, suhu, out_label, out_conf)
+        return out_label, out_conf
+
+@st.cache_resource
+def get_detector():
+    """Instance detector bersama untuk semua sesi (model dan kernel JIT dimuat sekali)"""
+    return WasteDetector()
 
 def main():
     # Header
-    st.markdown('<h1 class="main-header">🗑️ Deteksi Jenis Sampah</h1>', unsafe_allow_html=True)
+    st.markdown(_HEADER, unsafe_allow_html=True)
     
     # Sidebar
     with st.sidebar:
@@ -106,7 +133,7 @@ def main():
         st.write("- Sulit terurai")
     
     # Inisialisasi detector
-    detector = WasteDetector()
+    detector = get_detector()
     
     if input_method == "Manual Input":
         manual_input(detector)
@@ -124,8 +151,8 @@ def manual_input(detector):
             volume = st.slider("Volume (cm³):", 1, 1000, 200)
             kadar_air = st.slider("Kadar Air (%):", 0, 100, 60)
             suhu = st.slider("Suhu (°C):", 10, 50, 25)
-            warna = st.selectbox("Warna Dominan:", ["Hijau", "Coklat", "Putih", "Transparan", "Warna-warni"])
-            tekstur = st.selectbox("Tekstur:", ["Lunak", "Keras", "Elastis", "Rapuh"])
+            warna = st.selectbox("Warna Dominan:", list(WARNA_MAP))
+            tekstur = st.selectbox("Tekstur:", list(TEKSTUR_MAP))
             
             submitted = st.form_submit_button("Deteksi Jenis Sampah")
     
@@ -133,19 +160,28 @@ def manual_input(detector):
         st.subheader("Visualisasi & Hasil")
         
         if submitted:
-            # Mapping fitur tambahan ke nilai numerik
-            warna_map = {"Hijau": 1, "Coklat": 2, "Putih": 3, "Transparan": 4, "Warna-warni": 5}
-            tekstur_map = {"Lunak": 1, "Keras": 2, "Elastis": 3, "Rapuh": 4}
-            
-            features = [berat, volume, kadar_air, suhu, warna_map[warna], tekstur_map[tekstur]]
+            key = (berat, volume, kadar_air, suhu)
             
-            # Prediksi
-            waste_type, confidence = detector.model['predict'](features[:4])
+            if st.session_state.get('last_key') == key:
+                # Input sama dengan submit sebelumnya, pakai hasil tersimpan
+                waste_type, confidence = st.session_state['last_result']
+            else:
+                features = [berat, volume, kadar_air, suhu, WARNA_MAP[warna], TEKSTUR_MAP[tekstur]]
+                
+                # Prediksi (array 1 elemen lewat jalur batch)
+                labels, confidences = detector.model['predict'](
+                    *(np.array([x], dtype=np.float64) for x in features[:4])
+                )
+                waste_type, confidence = str(LABELS[labels[0]]), float(confidences[0])
+                
+                st.session_state['last_key'] = key
+                st.session_state['last_result'] = (waste_type, confidence)
             
             # Tampilkan hasil
             display_result(waste_type, confidence)
             
-            # Visualisasi
+            # Visualisasi (submit ulang dengan input sama memakai figure
+            # yang sama dari cache_resource create_visualization)
             fig = create_visualization(berat, volume, kadar_air, suhu, waste_type)
             st.plotly_chart(fig, use_container_width=True)
             
@@ -173,6 +209,39 @@ def manual_input(detector):
             )
             st.plotly_chart(fig, use_container_width=True)
 
+@st.cache_data
+def _load_csv(file_bytes: bytes) -> pd.DataFrame:
+    """Parse CSV upload, di-cache berdasarkan isi file"""
+    return pd.read_csv(
+        BytesIO(file_bytes),
+        usecols=FEATURE_COLUMNS,
+        engine='pyarrow'
+    )
+
+@st.cache_data
+def _score_csv(_detector, file_bytes: bytes) -> tuple:
+    """Prediksi batch untuk CSV upload, beserta statistik hasilnya"""
+    # Cache dikunci pada isi file (di-hash penuh), bukan sampel DataFrame
+    df = _load_csv(file_bytes)
+    
+    # Satu panggilan kolumnar untuk semua baris
+    out_label, out_conf = _detector.model['predict'](
+        *(df[col].to_numpy(dtype=np.float64) for col in FEATURE_COLUMNS)
+    )
+    
+    # Statistik langsung dari array kode label (0 = ORGANIK)
+    organic_count = int(np.sum(out_label == 0))
+    inorganic_count = len(out_label) - organic_count
+    avg_confidence = float(out_conf.mean())
+    
+    # Kolom label sebagai Categorical (kode int8) dan confidence float32
+    final_df = df.assign(
+        Jenis_Sampah=pd.Categorical.from_codes(out_label, categories=LABELS),
+        Confidence=out_conf.astype(np.float32),
+        Rekomendasi=pd.Categorical.from_codes(out_label, categories=REKOMENDASI)
+    )
+    return final_df, organic_count, inorganic_count, avg_confidence
+
 def csv_upload(detector):
     st.subheader("Upload Data CSV")
     
@@ -180,23 +249,13 @@ def csv_upload(detector):
     
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            df = _load_csv(file_bytes)
             st.write("Data Preview:")
             st.dataframe(df.head())
             
             if st.button("Proses Batch Detection"):
-                results = []
-                for _, row in df.iterrows():
-                    features = [row['berat'], row['volume'], row['kadar_air'], row['suhu']]
-                    waste_type, confidence = detector.model['predict'](features)
-                    results.append({
-                        'Jenis_Sampah': waste_type,
-                        'Confidence': confidence,
-                        'Rekomendasi': 'Kompos' if waste_type == 'ORGANIK' else 'Daur Ulang'
-                    })
-                
-                results_df = pd.DataFrame(results)
-                final_df = pd.concat([df, results_df], axis=1)
+                final_df, organic_count, inorganic_count, avg_confidence = _score_csv(detector, file_bytes)
                 
                 st.subheader("Hasil Deteksi Batch")
                 st.dataframe(final_df)
@@ -204,22 +263,20 @@ def csv_upload(detector):
                 # Statistik
                 col1, col2, col3 = st.columns(3)
                 with col1:
-                    organic_count = len(final_df[final_df['Jenis_Sampah'] == 'ORGANIK'])
                     st.metric("Sampah Organik", organic_count)
                 
                 with col2:
-                    inorganic_count = len(final_df[final_df['Jenis_Sampah'] == 'ANORGANIK'])
                     st.metric("Sampah Anorganik", inorganic_count)
                 
                 with col3:
-                    avg_confidence = final_df['Confidence'].mean()
                     st.metric("Rata-rata Confidence", f"{avg_confidence:.2%}")
                 
                 # Download hasil
-                csv = final_df.to_csv(index=False)
+                buf = BytesIO()
+                final_df.to_csv(buf, index=False, encoding='utf-8')
                 st.download_button(
                     label="Download Hasil CSV",
-                    data=csv,
+                    data=buf.getvalue(),
                     file_name="hasil_deteksi_sampah.csv",
                     mime="text/csv"
                 )
@@ -227,24 +284,30 @@ def csv_upload(detector):
         except Exception as e:
             st.error(f"Error membaca file: {e}")
 
-def display_result(waste_type, confidence):
-    if waste_type == "ORGANIK":
-        st.markdown(f"""
+# Template kotak hasil prediksi
+_ORGANIC_BOX = """
         <div class="prediction-box organic">
             <h2>🥦 HASIL: SAMPAH ORGANIK</h2>
             <h3>Tingkat Kepercayaan: {confidence:.2%}</h3>
             <p>Sampah ini mudah terurai secara alami</p>
         </div>
-        """, unsafe_allow_html=True)
-    else:
-        st.markdown(f"""
+        """
+_INORGANIC_BOX = """
         <div class="prediction-box inorganic">
             <h2>🧴 HASIL: SAMPAH ANORGANIK</h2>
             <h3>Tingkat Kepercayaan: {confidence:.2%}</h3>
             <p>Sampah ini sulit terurai, perlu didaur ulang</p>
         </div>
-        """, unsafe_allow_html=True)
+        """
+
+def display_result(waste_type, confidence):
+    if waste_type == "ORGANIK":
+        st.markdown(_ORGANIC_BOX.format(confidence=confidence), unsafe_allow_html=True)
+    else:
+        st.markdown(_INORGANIC_BOX.format(confidence=confidence), unsafe_allow_html=True)
 
+# cache_resource: figure dikembalikan tanpa pickle/unpickle (tidak diubah setelah dibuat)
+@st.cache_resource(max_entries=256)
 def create_visualization(berat, volume, kadar_air, suhu, waste_type):
     # Radar chart
     categories = ['Berat', 'Volume', 'Kadar Air', 'Suhu']